@@ -3,13 +3,32 @@ Base Trading Bot Class
 Contains common logic for strategy, position management, and statistics.
 """
 
+import math
+import queue
+import sys
 import threading
 import time
 from datetime import datetime
-from collections import deque
-from decimal import Decimal, ROUND_DOWN
+from collections import deque, namedtuple
+from decimal import Decimal
 from abc import ABC, abstractmethod
 
+import numpy as np
+
+from indicators import (
+    IND_LAST_CLOSE, IND_MA_FAST_SUM, IND_MA_SLOW_SUM, IND_RSI_AVG_GAIN,
+    IND_RSI_AVG_LOSS, IND_STATE_SIZE, _rsi_wilder, update_indicators,
+)
+
+# Ring buffer capacity — matches the old klines deque maxlen
+RING_SIZE = 200
+# Trade ring capacity — matches the old trades deque maxlen
+TRADE_RING_SIZE = 1000
+
+# Legacy-compat candle record: attribute access beats dict hashing and a
+# slot-backed tuple is ~4x smaller than the old per-candle dict
+Candle = namedtuple('Candle', 'time open high low close volume')
+
 class BaseTradingBot(ABC):
     def __init__(self, config):
         """
@@ -26,14 +45,36 @@ class BaseTradingBot(ABC):
         
         # Data storage
         self.current_price = None
-        self.trades = deque(maxlen=1000)
-        self.klines = deque(maxlen=200)
+        # Trade ring buffer: (price, timestamp) rows, no per-trade allocation
+        self._trade_buf = np.empty((TRADE_RING_SIZE, 2), dtype=np.float64)
+        self._trade_idx = 0
+        # Legacy-compat view of candles for code still reading dict fields
+        self.klines = deque(maxlen=RING_SIZE)
+        # Pre-bound: saves the attribute chain lookup per closed candle
+        self._klines_append = self.klines.append
+
+        # Struct-of-arrays kline ring buffers, one float64 array per field
+        # (_head counts candles monotonically)
+        self._ring = {f: np.empty(RING_SIZE, dtype=np.float64) for f in 'tohlcv'}
+        self._close = self._ring['c']
+        self._head = 0
         
         # Position management
         self.position = None
         self.entry_price = None
         self.position_size = 0
         self.unrealized_pnl = 0
+        # Absolute SL/TP levels, cached at open_position so the per-tick
+        # check is two float compares
+        self._sl_px = None
+        self._tp_px = None
+        # Single flag the trade handlers test before doing any position work
+        self._in_position = False
+        # SL/TP multipliers per entry side (sl_mult, tp_mult)
+        self._sl_tp_mults = {
+            'BUY': (1 - config.get('sl_pct', 0.02), 1 + config.get('tp_pct', 0.03)),
+            'SELL': (1 + config.get('sl_pct', 0.02), 1 - config.get('tp_pct', 0.03)),
+        }
         
         # Strategy parameters
         self.ma_fast = 10
@@ -41,6 +82,16 @@ class BaseTradingBot(ABC):
         self.rsi_period = 14
         self.rsi_overbought = 70
         self.rsi_oversold = 30
+
+        # Fused incremental indicator state (MA sums + Wilder RSI), advanced by
+        # one update_indicators kernel call per closed candle
+        self._ind_state = np.zeros(IND_STATE_SIZE, dtype=np.float64)
+
+        # Resolve the strategy once instead of string-comparing every candle
+        self._strategy_fn = {
+            'ma_cross': self.check_ma_cross_strategy,
+            'rsi': self.check_rsi_strategy,
+        }.get(self.strategy_name)
         
         # Statistics
         self.total_trades = 0
@@ -49,11 +100,22 @@ class BaseTradingBot(ABC):
         
         # Runtime
         self.running = False
+        # Set by stop(); threads park on it instead of polling self.running
+        self._stop_event = threading.Event()
+
+        # Hot-path log lines go through a bounded queue drained off-thread so
+        # the stream callbacks never block on stdout
+        self._log_q = queue.Queue(maxsize=10_000)
+        self._log_thread = threading.Thread(target=self._drain_log_queue, daemon=True)
+        self._log_thread.start()
+        # print_status rate limit: emit at most once per second
+        self._last_status_t = 0.0
         
         # Default info (override in subclasses)
         self.tick_size = 0.01
         self.step_size = 0.0001
-        
+        self._compute_round_scales()
+
     @abstractmethod
     def get_symbol_info(self):
         """Get symbol specifics (tick_size, step_size, etc.)"""
@@ -74,119 +136,224 @@ class BaseTradingBot(ABC):
         """Calculate trade quantity based on money management"""
         pass
 
+    def _compute_round_scales(self):
+        """Precompute integer scales so rounding avoids per-call Decimal parsing.
+        Call again whenever tick_size/step_size change (e.g. get_symbol_info)."""
+        tick = Decimal(str(self.tick_size))
+        step = Decimal(str(self.step_size))
+        self._qty_scale = float(1 / step)
+        self._price_scale = float(1 / tick)
+        # Power-of-10 sizes (0.01, 100, ...) take the pure-float fast path;
+        # exotic sizes like 0.25 fall back to exact Decimal arithmetic
+        self._tick_pow10 = tick.as_tuple().digits == (1,)
+        self._step_pow10 = step.as_tuple().digits == (1,)
+        self._tick_decimal = tick
+        self._step_decimal = step
+
+    @staticmethod
+    def _floor_scaled(value, scale):
+        """floor(value * scale) with a one-ULP guard.
+
+        Exact grid multiples can land a hair below the integer after the
+        multiply (0.29 * 100 == 28.999...); without the guard they would be
+        floored down a whole increment.
+        """
+        s = value * scale
+        i = math.floor(s)
+        if s - i > 1 - 1e-9:
+            i += 1
+        return i
+
     def round_quantity(self, quantity):
-        """Round quantity to step size"""
-        precision = len(str(self.step_size).split('.')[-1].rstrip('0'))
-        if '.' in str(self.step_size) and precision > 0:
-             return float(Decimal(str(quantity)).quantize(
-                Decimal(str(self.step_size)), 
-                rounding=ROUND_DOWN
-            ))
-        else:
-            return int(quantity)
+        """Round quantity down to step size"""
+        if self._step_pow10:
+            return self._floor_scaled(quantity, self._qty_scale) / self._qty_scale
+        return float((Decimal(str(quantity)) // self._step_decimal) * self._step_decimal)
 
     def round_price(self, price):
-        """Round price to tick size"""
-        precision = len(str(self.tick_size).split('.')[-1].rstrip('0'))
-        if '.' in str(self.tick_size) and precision > 0:
-             return float(Decimal(str(price)).quantize(
-                Decimal(str(self.tick_size)), 
-                rounding=ROUND_DOWN
-            ))
+        """Round price down to tick size"""
+        if self._tick_pow10:
+            return self._floor_scaled(price, self._price_scale) / self._price_scale
+        return float((Decimal(str(price)) // self._tick_decimal) * self._tick_decimal)
+
+    def _record_trade(self, price, ts):
+        """Write a trade into the (price, timestamp) ring buffer"""
+        self._trade_buf[self._trade_idx % TRADE_RING_SIZE, 0] = price
+        self._trade_buf[self._trade_idx % TRADE_RING_SIZE, 1] = ts
+        self._trade_idx += 1
+
+    def _log(self, msg):
+        """Queue a hot-path log line; drops on overflow rather than blocking"""
+        try:
+            self._log_q.put_nowait(msg)
+        except queue.Full:
+            pass
+
+    def _drain_log_queue(self):
+        """Daemon thread: write queued log lines to stdout"""
+        while True:
+            sys.stdout.write(self._log_q.get() + "\n")
+            # Flush per line so piped (block-buffered) output doesn't lag
+            sys.stdout.flush()
+
+    def _flush_logs(self):
+        """Synchronously drain queued log lines; called at shutdown so the
+        final trade output is not lost when the daemon drainer dies"""
+        while True:
+            try:
+                sys.stdout.write(self._log_q.get_nowait() + "\n")
+            except queue.Empty:
+                break
+        sys.stdout.flush()
+
+    def _recent(self, arr, n):
+        """Last n ring entries as a contiguous array (two-slice unwrap only on wrap)"""
+        count = min(self._head, RING_SIZE)
+        n = min(n, count)
+        if n == 0:
+            return arr[:0]
+        start = (self._head - n) % RING_SIZE
+        end = self._head % RING_SIZE
+        if start < end:
+            return arr[start:end]
+        return np.concatenate((arr[start:], arr[:end]))
+
+    def _recent_closes(self, n):
+        """Last n closes as a contiguous array"""
+        return self._recent(self._close, n)
+
+    def recent(self, field, n):
+        """Last n values of a kline field ('t','o','h','l','c','v')"""
+        return self._recent(self._ring[field], n)
+
+    def append_candle(self, t, o, h, l, c, v):
+        """Write a closed candle into the SoA ring and advance indicator state"""
+        i = self._head % RING_SIZE
+        ring = self._ring
+        ring['t'][i] = t
+        ring['o'][i] = o
+        ring['h'][i] = h
+        ring['l'][i] = l
+        ring['c'][i] = c
+        ring['v'][i] = v
+        self._head += 1
+        update_indicators(
+            self._close, self._head, self.ma_fast, self.ma_slow,
+            self.rsi_period, self._ind_state
+        )
+        self._klines_append(Candle(t, o, h, l, c, v))
+
+    def _seed_indicators(self):
+        """Rebuild incremental indicator state from the close ring in one pass.
+        Used after bulk history loads instead of replaying candle-by-candle."""
+        closes = self._recent_closes(RING_SIZE)
+        st = self._ind_state
+        st[:] = 0.0
+        n = len(closes)
+        if n == 0:
+            return
+        st[IND_MA_FAST_SUM] = float(closes[-self.ma_fast:].sum())
+        st[IND_MA_SLOW_SUM] = float(closes[-self.ma_slow:].sum())
+        if n > self.rsi_period:
+            _, avg_gain, avg_loss = _rsi_wilder(closes, self.rsi_period)
+            st[IND_RSI_AVG_GAIN] = avg_gain
+            st[IND_RSI_AVG_LOSS] = avg_loss
         else:
-            return 
-            
-            int(price - (price % self.tick_size))
-            
+            # Still seeding: the kernel expects raw gain/loss sums here
+            diffs = np.diff(closes)
+            st[IND_RSI_AVG_GAIN] = float(np.maximum(diffs, 0.0).sum())
+            st[IND_RSI_AVG_LOSS] = float(np.maximum(-diffs, 0.0).sum())
+        st[IND_LAST_CLOSE] = float(closes[-1])
+
     def calculate_ma(self, period):
-        """Calculate Moving Average"""
-        if len(self.klines) < period:
+        """Calculate Moving Average from the fused kernel state (O(1))"""
+        if self._head < period:
+            return None
+        if period == self.ma_fast:
+            return self._ind_state[IND_MA_FAST_SUM] / period
+        if period == self.ma_slow:
+            return self._ind_state[IND_MA_SLOW_SUM] / period
+        # Uncached period: direct vector mean over the ring
+        if period > RING_SIZE:
             return None
-        prices = [float(k['close']) for k in list(self.klines)[-period:]]
-        return sum(prices) / period
+        return float(self._recent_closes(period).mean())
 
     def calculate_rsi(self, period=14):
-        """Calculate RSI"""
-        if len(self.klines) < period + 1:
+        """Calculate RSI via Wilder smoothing (O(1) for the tracked period)"""
+        if self._head <= period:
             return None
-        closes = [float(k['close']) for k in list(self.klines)[-(period+1):]]
-        gains = []
-        losses = []
-        for i in range(1, len(closes)):
-            change = closes[i] - closes[i-1]
-            if change > 0:
-                gains.append(change)
-                losses.append(0)
-            else:
-                gains.append(0)
-                losses.append(abs(change))
-        avg_gain = sum(gains) / period
-        avg_loss = sum(losses) / period
-        if avg_loss == 0:
-            return 100
-        rs = avg_gain / avg_loss
-        return 100 - (100 / (1 + rs))
+        if period == self.rsi_period:
+            avg_loss = self._ind_state[IND_RSI_AVG_LOSS]
+            if avg_loss == 0:
+                return 100
+            rs = self._ind_state[IND_RSI_AVG_GAIN] / avg_loss
+            return 100 - (100 / (1 + rs))
+        # Uncached period: full Wilder pass over the buffered closes
+        rsi, _, _ = _rsi_wilder(self._recent_closes(RING_SIZE), period)
+        return None if math.isnan(rsi) else float(rsi)
 
     def check_strategy(self):
-        """Route to appropriate strategy"""
-        if self.strategy_name == 'ma_cross':
-            ma_fast = self.calculate_ma(self.ma_fast)
-            ma_slow = self.calculate_ma(self.ma_slow)
-            if not ma_fast or not ma_slow:
-                return None
-                
-            print(f"📊 MA({self.ma_fast}): {ma_fast:.2f} | MA({self.ma_slow}): {ma_slow:.2f}")
-            if ma_fast > ma_slow and self.position != 'LONG':
-                return 'BUY'
-            elif ma_fast < ma_slow and self.position == 'LONG':
-                return 'SELL'
-                
-        elif self.strategy_name == 'rsi':
-            rsi = self.calculate_rsi(self.rsi_period)
-            if not rsi:
-                return None
-                
-            print(f"📊 RSI({self.rsi_period}): {rsi:.2f}")
-            if rsi < self.rsi_oversold and self.position != 'LONG':
-                return 'BUY'
-            elif rsi > self.rsi_overbought and self.position == 'LONG':
-                return 'SELL'
-                
+        """Route to the strategy resolved at __init__"""
+        if self._strategy_fn is None:
+            return None
+        return self._strategy_fn()
+
+    def check_ma_cross_strategy(self):
+        """MA cross strategy"""
+        # Straight off the fused kernel state: two divisions, no data touched
+        if self._head < self.ma_slow:
+            return None
+        ma_fast = self._ind_state[IND_MA_FAST_SUM] / self.ma_fast
+        ma_slow = self._ind_state[IND_MA_SLOW_SUM] / self.ma_slow
+
+        self._log(f"📊 MA({self.ma_fast}): {ma_fast:.2f} | MA({self.ma_slow}): {ma_slow:.2f}")
+        if ma_fast > ma_slow and self.position != 'LONG':
+            return 'BUY'
+        elif ma_fast < ma_slow and self.position == 'LONG':
+            return 'SELL'
+        return None
+
+    def check_rsi_strategy(self):
+        """RSI strategy"""
+        rsi = self.calculate_rsi(self.rsi_period)
+        if not rsi:
+            return None
+
+        self._log(f"📊 RSI({self.rsi_period}): {rsi:.2f}")
+        if rsi < self.rsi_oversold and self.position != 'LONG':
+            return 'BUY'
+        elif rsi > self.rsi_overbought and self.position == 'LONG':
+            return 'SELL'
         return None
 
     def calculate_stop_loss_take_profit(self, side, entry_price):
         """Calculate Stop Loss and Take Profit"""
-        if side == 'BUY':
-            sl_price = self.round_price(entry_price * 0.98)
-            tp_price = self.round_price(entry_price * 1.03)
-        else:
-            sl_price = self.round_price(entry_price * 1.02)
-            tp_price = self.round_price(entry_price * 0.97)
-        return sl_price, tp_price
+        sl_mult, tp_mult = self._sl_tp_mults[side]
+        return self.round_price(entry_price * sl_mult), self.round_price(entry_price * tp_mult)
 
     def place_order(self, side, quantity):
         """Handle order placement wrapper"""
         try:
-            print(f"\n💰 Placing Order: {side} {quantity} {self.symbol}")
+            self._log(f"\n💰 Placing Order: {side} {quantity} {self.symbol}")
             order = self.place_order_api(side, quantity)
-            
+
             if order:
-                print(f"✅ Order exectued: {order['orderId']}")
+                self._log(f"✅ Order exectued: {order['orderId']}")
                 return order
             return None
         except Exception as e:
-            print(f"❌ Error placing order: {e}")
+            self._log(f"❌ Error placing order: {e}")
             return None
 
     def open_position(self, signal):
         """Open new position"""
         if self.position is not None:
-            print("⚠️  Position exists, skipping signal")
+            self._log("⚠️  Position exists, skipping signal")
             return
-        
+
         quantity = self.calculate_quantity()
         if quantity <= 0:
-            print("❌ Invalid Quantity")
+            self._log("❌ Invalid Quantity")
             return
             
         order = self.place_order(signal, quantity)
@@ -196,9 +363,12 @@ class BaseTradingBot(ABC):
             self.position_size = float(order['quantity'])
             
             sl, tp = self.calculate_stop_loss_take_profit(signal, self.entry_price)
-            
-            print(f"\n🎯 Position Opened: {self.position} @ {self.entry_price}")
-            print(f"   SL: {sl} | TP: {tp}")
+            self._sl_px = sl
+            self._tp_px = tp
+            self._in_position = True
+
+            self._log(f"\n🎯 Position Opened: {self.position} @ {self.entry_price}")
+            self._log(f"   SL: {sl} | TP: {tp}")
             self.total_trades += 1
 
     def close_position(self, reason="Signal"):
@@ -224,56 +394,71 @@ class BaseTradingBot(ABC):
             if pnl > 0: self.winning_trades += 1
             
             emoji = "💚" if pnl > 0 else "❤️"
-            print(f"\n{emoji} Position Closed ({reason})")
-            print(f"   Entry: {self.entry_price} -> Exit: {exit_price}")
-            print(f"   PnL: {pnl:,.2f}")
+            self._log(f"\n{emoji} Position Closed ({reason})")
+            self._log(f"   Entry: {self.entry_price} -> Exit: {exit_price}")
+            self._log(f"   PnL: {pnl:,.2f}")
             
             self.position = None
             self.entry_price = None
             self.position_size = 0
+            self._sl_px = None
+            self._tp_px = None
+            self._in_position = False
 
     def check_position_management(self):
-        """Check Stop Loss / Take Profit"""
-        if not self.position or not self.entry_price or not self.current_price:
+        """Check Stop Loss / Take Profit against the cached absolute levels"""
+        px = self.current_price
+        if self._sl_px is None or px is None:
             return
-            
+
         if self.position == 'LONG':
-            pnl_pct = (self.current_price - self.entry_price) / self.entry_price
-            if pnl_pct <= -0.02: self.close_position("Stop Loss")
-            elif pnl_pct >= 0.03: self.close_position("Take Profit")
-            self.unrealized_pnl = pnl_pct * 100
+            if px <= self._sl_px:
+                self.close_position("Stop Loss")
+            elif px >= self._tp_px:
+                self.close_position("Take Profit")
+            else:
+                self.unrealized_pnl = (px - self.entry_price) / self.entry_price * 100
         # Add Short logic if needed
             
     def print_status(self):
-        """Print status"""
-        print(f"\n{'='*60}")
-        print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        """Print status (rate-limited, routed through the log queue)"""
+        # Called from the message handlers: cap the formatting + I/O cost at
+        # one emission per second no matter the tick rate
+        now = time.monotonic()
+        if now - self._last_status_t < 1.0:
+            return
+        self._last_status_t = now
+
+        lines = [f"\n{'='*60}", f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"]
         if self.current_price:
-            print(f"💰 Price: {self.current_price:,.2f}")
-        
+            lines.append(f"💰 Price: {self.current_price:,.2f}")
+
         if self.position:
-            print(f"📊 Position: {self.position} @ {self.entry_price} (Unrealized: {self.unrealized_pnl:+.2f}%)")
+            lines.append(f"📊 Position: {self.position} @ {self.entry_price} (Unrealized: {self.unrealized_pnl:+.2f}%)")
         else:
-            print(f"📊 Position: None")
-            
+            lines.append(f"📊 Position: None")
+
         if self.total_trades > 0:
             win_rate = self.winning_trades / self.total_trades * 100
-            print(f"📈 Stats: Trades: {self.total_trades} | Win Rate: {win_rate:.1f}% | Total PnL: {self.total_pnl:,.2f}")
-        print(f"{'='*60}\n")
+            lines.append(f"📈 Stats: Trades: {self.total_trades} | Win Rate: {win_rate:.1f}% | Total PnL: {self.total_pnl:,.2f}")
+        lines.append(f"{'='*60}\n")
+        self._log("\n".join(lines))
 
     def run_loop(self):
         """Main loop"""
         print("\n🚀 Bot running! Press Ctrl+C to stop.\n")
         try:
-            while self.running:
-                time.sleep(1)
+            # Blocks with zero wakeups until stop() fires the event
+            self._stop_event.wait()
         except KeyboardInterrupt:
             self.stop()
-            
+
     def stop(self):
         """Stop bot"""
         print("\n⏹️  Stopping bot...")
         if self.position:
             self.close_position("Bot Stopped")
         self.running = False
+        self._stop_event.set()
+        self._flush_logs()
         print("✅ Bot stopped.")
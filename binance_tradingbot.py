@@ -2,12 +2,46 @@
 Binance Trading Bot (Inherits from BaseBot)
 """
 
-import threading
-import json
+import asyncio
+import re
+import time
+from operator import itemgetter
+
+import numpy as np
+
+try:
+    import orjson as _json  # C parser, ~2-3x faster on small messages
+except ImportError:
+    import json as _json
+
+# Pre-bound: one global load instead of module + attribute per message
+_loads = _json.loads
+
+try:
+    import uvloop  # libuv event loop: 2-4x socket throughput vs stdlib
+except ImportError:
+    uvloop = None
+
+try:
+    # Reused parser: SIMD structural indexing, values materialize only for
+    # the keys we touch (kline frames carry far more than we read)
+    import simdjson
+    _KLINE_PARSER = simdjson.Parser()
+except ImportError:  # pysimdjson is optional (wants an AVX2-capable CPU)
+    _KLINE_PARSER = None
+
 from base_bot import BaseTradingBot
 from binance.client import Client
+from requests.adapters import HTTPAdapter
 from binance.enums import *
-import websocket
+import websockets
+
+# Trade frames have a fixed schema and we only need "p" — one C-level regex
+# pass is 3-5x cheaper than decoding the whole payload
+_PRICE_RE = re.compile(r'"p":"([\d.]+)"')
+
+# One C-level call extracts all six kline fields instead of six subscripts
+_KLINE_FIELDS = itemgetter('t', 'o', 'h', 'l', 'c', 'v')
 
 class BinanceTradingBot(BaseTradingBot):
     def __init__(self, api_key, api_secret, config):
@@ -16,6 +50,8 @@ class BinanceTradingBot(BaseTradingBot):
         self.api_secret = api_secret
         self.testnet = config.get('testnet', True)
         self.trade_amount_usdt = config.get('trade_amount_usdt', 100)
+        # Refined in get_symbol_info once min_notional is known
+        self._min_order_usdt = self.trade_amount_usdt
         
         # Initialize Client
         # CP1:
@@ -24,16 +60,21 @@ class BinanceTradingBot(BaseTradingBot):
         if self.testnet:
             self.client = Client(api_key, api_secret, testnet=True)
             self.client.API_URL = 'https://testnet.binance.vision/api'
-            ws_base = "wss://testnet.binance.vision/ws"
+            ws_base = "wss://testnet.binance.vision"
         else:
             self.client = Client(api_key, api_secret)
-            ws_base = "wss://stream.binance.com:9443/ws"
-            
-        self.ws_url = f"{ws_base}/{self.symbol.lower()}@trade"
-        self.ws_kline_url = f"{ws_base}/{self.symbol.lower()}@kline_1m"
-        
-        self.ws = None
-        self.ws_kline = None
+            ws_base = "wss://stream.binance.com:9443"
+
+        # Widen the REST connection pool and pin keep-alive: the historical
+        # backfill issues many sequential requests and a fresh TLS handshake
+        # costs ~100ms each
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self.client.session.mount('https://', adapter)
+        self.client.session.headers['Connection'] = 'keep-alive'
+
+        # One combined stream instead of separate trade/kline sockets
+        sym = self.symbol.lower()
+        self.ws_url = f"{ws_base}/stream?streams={sym}@trade/{sym}@kline_1m"
 
     def get_symbol_info(self):
         """Get symbol specifics from Binance"""
@@ -47,6 +88,12 @@ class BinanceTradingBot(BaseTradingBot):
                     self.tick_size = float(f['tickSize'])
                 elif f['filterType'] == 'MIN_NOTIONAL':
                     self.min_notional = float(f.get('minNotional', 10))
+            self._compute_round_scales()
+            # Order value per entry: configured amount, floored at min
+            # notional (+1% headroom) so the per-call work is one division
+            self._min_order_usdt = max(
+                self.trade_amount_usdt, getattr(self, 'min_notional', 10) * 1.01
+            )
             print(f"📊 Symbol Info: Tick {self.tick_size}, Step {self.step_size}")
         except Exception as e:
             print(f"❌ Error getting symbol info: {e}")
@@ -54,15 +101,10 @@ class BinanceTradingBot(BaseTradingBot):
     def calculate_quantity(self):
         """Calculate quantity based on USDT amount"""
         if not self.current_price: return 0
-        quantity = self.trade_amount_usdt / self.current_price
-        quantity = self.round_quantity(quantity)
-        if quantity * self.current_price < getattr(self, 'min_notional', 10):
-            quantity = self.round_quantity(getattr(self, 'min_notional', 10) / self.current_price * 1.01)
-        return quantity
+        return self.round_quantity(self._min_order_usdt / self.current_price)
 
     def place_order_api(self, side, quantity, price=None, order_type=ORDER_TYPE_MARKET):
         """Place Order via Binance API"""
-        print(f"DEBUG: Placing {side} {quantity}")
         try:
             # CP4:
             # - SDK hỗ trợ nhiều method cho từng loại lệnh với từng argument truyền lên API -> người dùng ko bị confuse giữa các argument của API
@@ -76,12 +118,22 @@ class BinanceTradingBot(BaseTradingBot):
                 quantity=quantity
             )
             
-            filled_qty = float(order.get('executedQty', 0))
-            avg_price = 0
-            if 'fills' in order:
-                total_cost = sum(float(f['price']) * float(f['qty']) for f in order['fills'])
-                avg_price = total_cost / filled_qty if filled_qty > 0 else 0
-                
+            # Aggregate the fills with one BLAS dot product instead of a
+            # Python loop — large market orders can fan out across many
+            # partial fills and this sits on the order-placement path
+            fills = order.get('fills', ())
+            if fills:
+                prices = np.fromiter(
+                    (f['price'] for f in fills), dtype=np.float64, count=len(fills)
+                )
+                qtys = np.fromiter(
+                    (f['qty'] for f in fills), dtype=np.float64, count=len(fills)
+                )
+                filled_qty = float(qtys.sum())
+                avg_price = float(prices @ qtys) / filled_qty if filled_qty > 0 else 0.0
+            else:
+                filled_qty = avg_price = 0.0
+
             return {
                 'orderId': order['orderId'],
                 'quantity': filled_qty,
@@ -92,16 +144,13 @@ class BinanceTradingBot(BaseTradingBot):
             print(f"Error: {e}")
             return None
 
-    def on_kline_message(self, ws, message):
+    def _handle_kline(self, data):
         """Process kline data"""
         try:
-            data = json.loads(message)
             kline = data['k']
             if kline['x']:
-                self.klines.append({
-                    'time': kline['t'], 'open': kline['o'], 'high': kline['h'], 
-                    'low': kline['l'], 'close': kline['c'], 'volume': kline['v']
-                })
+                # Convert string fields exactly once at ingest
+                self.append_candle(*map(float, _KLINE_FIELDS(kline)))
                 signal = self.check_strategy()
                 if signal:
                     if (signal == 'BUY' and self.position != 'LONG') or \
@@ -110,36 +159,83 @@ class BinanceTradingBot(BaseTradingBot):
                         self.open_position(signal)
                 self.print_status()
         except Exception as e:
-            print(f"Kline Error: {e}")
+            self._log(f"Kline Error: {e}")
 
-    def on_trade_message(self, ws, message):
+    def _handle_trade(self, data):
         """Process trade data"""
+        # A malformed frame (missing envelope, no 'p') must not propagate
+        # out of the receive loop and tear down the whole stream
         try:
-            data = json.loads(message)
-            self.current_price = float(data['p'])
+            price = float(data['p'])
+        except (ValueError, KeyError, TypeError) as e:
+            self._log(f"Trade Error: {e}")
+            return
+        self.current_price = price
+        self._record_trade(price, time.time())
+        if self._in_position:
             self.check_position_management()
-        except Exception:
-            pass
 
-    def start_stream(self):
-        """Start WebSocket streams"""
+    def _handle_trade_raw(self, message):
+        """Extract the trade price from the raw frame, JSON parse only on miss"""
+        m = _PRICE_RE.search(message)
+        if m:
+            price = float(m.group(1))
+            self.current_price = price
+            self._record_trade(price, time.time())
+            if self._in_position:
+                self.check_position_management()
+        else:
+            try:
+                data = _loads(message).get('data')
+            except ValueError as e:
+                self._log(f"Trade Error: {e}")
+                return
+            self._handle_trade(data)
+
+    async def run_ws(self):
+        """Single combined-stream WebSocket loop (trade + 1m kline)"""
         # CP3:
         # - Raw Websocket: dễ dàng kết nối và tùy chỉnh với đa dạng ngôn ngữ
-        self.ws = websocket.WebSocketApp(
-            self.ws_url, on_message=self.on_trade_message,
-            on_open=lambda ws: print("✅ Trade WS connected")
-        )
-        self.ws_kline = websocket.WebSocketApp(
-            self.ws_kline_url, on_message=self.on_kline_message,
-            on_open=lambda ws: print("✅ Kline WS connected")
-        )
-        
-        t1 = threading.Thread(target=self.ws.run_forever)
-        t2 = threading.Thread(target=self.ws_kline.run_forever)
-        t1.daemon = True
-        t2.daemon = True
-        t1.start()
-        t2.start()
+        async with websockets.connect(self.ws_url) as ws:
+            print("✅ Combined WS connected")
+            # Local bindings: one LOAD_FAST per message instead of LOAD_ATTR
+            handle_trade_raw = self._handle_trade_raw
+            async for message in ws:
+                if not self.running:
+                    break
+                if '@trade"' in message:
+                    handle_trade_raw(message)
+                    continue
+                # Kline updates arrive every ~250ms but only the closed candle
+                # (x:true) matters — a substring scan beats parsing the ~99%
+                # of frames we would discard anyway
+                if '"x":true' not in message:
+                    continue
+                try:
+                    if _KLINE_PARSER is not None:
+                        envelope = _KLINE_PARSER.parse(
+                            message.encode() if isinstance(message, str) else message
+                        )
+                    else:
+                        envelope = _loads(message)
+                    stream = envelope['stream']
+                    data = envelope['data']
+                except Exception as e:
+                    self._log(f"WS Parse Error: {e}")
+                    continue
+                if stream.endswith('@trade'):
+                    self._handle_trade(data)
+                elif stream.endswith('@kline_1m'):
+                    self._handle_kline(data)
+
+    def start_stream(self):
+        """Run the combined WebSocket stream on one asyncio event loop"""
+        if uvloop is not None:
+            uvloop.install()
+        try:
+            asyncio.run(self.run_ws())
+        except KeyboardInterrupt:
+            self.stop()
 
     def start(self):
         """Start Bot"""
@@ -149,23 +245,19 @@ class BinanceTradingBot(BaseTradingBot):
         end_time="1 Feb, 2026"
         # CP2
         # - Hỗ trợ da dạng timeframe data (1s, 1m,3m,5m,... 1d,3d,1w,1M)
-        klines = self.client.get_historical_klines(
-            symbol=self.symbol, interval=Client.KLINE_INTERVAL_1MINUTE, start_time, end_time
-        )
-        for k in klines:
-            self.klines.append({
-                'time': k[0], 'open': k[1], 'high': k[2], 'low': k[3], 'close': k[4], 'volume': k[5]
-            })
-        print(f"Loaded {len(self.klines)} candles")
+        # Stream the backfill: the generator pages through the range without
+        # materializing it, and only the ring window is ever retained
+        loaded = 0
+        for k in self.client.get_historical_klines_generator(
+            self.symbol, Client.KLINE_INTERVAL_1MINUTE, start_time, end_time
+        ):
+            self.append_candle(*map(float, k[:6]))
+            loaded += 1
+        print(f"Loaded {loaded} candles")
         
         self.running = True
+        print("\n🚀 Bot running! Press Ctrl+C to stop.\n")
         self.start_stream()
-        self.run_loop()
-
-    def stop(self):
-        super().stop()
-        if self.ws: self.ws.close()
-        if self.ws_kline: self.ws_kline.close()
 
 def main():
     API_KEY = "YOUR_API_KEY"
@@ -0,0 +1,130 @@
+"""
+Indicator kernels shared by the trading bots.
+
+Compiled to native code with numba when it is installed; otherwise the
+plain-Python definitions run as-is. Signatures are explicit so compilation
+happens at import, not on the first market-data frame.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional — fall back to a no-op decorator
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+
+@njit("UniTuple(float64, 3)(float64, float64, float64, int64)",
+      cache=True, fastmath=True)
+def _rsi_update(prev_avg_gain, prev_avg_loss, delta, period):
+    """One Wilder smoothing step for a single close-to-close delta.
+
+    Returns (rsi, avg_gain, avg_loss).
+    """
+    # max() compiles to a branchless maxsd under LLVM
+    gain = max(delta, 0.0)
+    loss = max(-delta, 0.0)
+    avg_gain = (prev_avg_gain * (period - 1) + gain) / period
+    avg_loss = (prev_avg_loss * (period - 1) + loss) / period
+    if avg_loss == 0:
+        return 100.0, avg_gain, avg_loss
+    rs = avg_gain / avg_loss
+    return 100.0 - 100.0 / (1.0 + rs), avg_gain, avg_loss
+
+
+# State vector layout for update_indicators
+IND_STATE_SIZE = 5
+IND_MA_FAST_SUM = 0
+IND_MA_SLOW_SUM = 1
+IND_RSI_AVG_GAIN = 2
+IND_RSI_AVG_LOSS = 3
+IND_LAST_CLOSE = 4
+
+
+@njit("void(float64[:], int64, int64, int64, int64, float64[:])",
+      cache=True, fastmath=True)
+def update_indicators(ring, head, fast, slow, rsi_period, state):
+    """Advance MA sums and Wilder RSI for the close just written at head-1.
+
+    One kernel call per closed candle amortizes the dispatch overhead across
+    all indicators. Mutates `state` in place (layout above); while seeding,
+    the RSI slots hold raw gain/loss sums until rsi_period diffs are seen.
+    """
+    size = ring.shape[0]
+    close = ring[(head - 1) % size]
+
+    # Running MA sums: subtract the value falling out of each full window
+    if head > fast:
+        state[IND_MA_FAST_SUM] += close - ring[(head - 1 - fast) % size]
+    else:
+        state[IND_MA_FAST_SUM] += close
+    if head > slow:
+        state[IND_MA_SLOW_SUM] += close - ring[(head - 1 - slow) % size]
+    else:
+        state[IND_MA_SLOW_SUM] += close
+
+    if head == 1:
+        state[IND_LAST_CLOSE] = close
+        return
+
+    change = close - state[IND_LAST_CLOSE]
+    state[IND_LAST_CLOSE] = close
+    gain = max(change, 0.0)
+    loss = max(-change, 0.0)
+    n_diffs = head - 1
+    if n_diffs < rsi_period:
+        state[IND_RSI_AVG_GAIN] += gain
+        state[IND_RSI_AVG_LOSS] += loss
+    elif n_diffs == rsi_period:
+        state[IND_RSI_AVG_GAIN] = (state[IND_RSI_AVG_GAIN] + gain) / rsi_period
+        state[IND_RSI_AVG_LOSS] = (state[IND_RSI_AVG_LOSS] + loss) / rsi_period
+    else:
+        _, avg_gain, avg_loss = _rsi_update(
+            state[IND_RSI_AVG_GAIN], state[IND_RSI_AVG_LOSS], change, rsi_period
+        )
+        state[IND_RSI_AVG_GAIN] = avg_gain
+        state[IND_RSI_AVG_LOSS] = avg_loss
+
+
+@njit("float64(float64[:], int64)", cache=True, fastmath=True)
+def _sma(closes, period):
+    """Simple moving average over the last `period` closes"""
+    if period <= 0 or closes.shape[0] < period:
+        return np.nan
+    total = 0.0
+    for i in range(closes.shape[0] - period, closes.shape[0]):
+        total += closes[i]
+    return total / period
+
+
+@njit("UniTuple(float64, 3)(float64[:], int64)", cache=True, fastmath=True)
+def _rsi_wilder(closes, period):
+    """Wilder RSI over a full close series.
+
+    Returns (rsi, avg_gain, avg_loss) so callers can seed incremental state.
+    """
+    n = closes.shape[0]
+    if n <= period:
+        return np.nan, np.nan, np.nan
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        change = closes[i] - closes[i - 1]
+        avg_gain += max(change, 0.0)
+        avg_loss += max(-change, 0.0)
+    avg_gain /= period
+    avg_loss /= period
+    for i in range(period + 1, n):
+        _, avg_gain, avg_loss = _rsi_update(
+            avg_gain, avg_loss, closes[i] - closes[i - 1], period
+        )
+    if avg_loss == 0:
+        return 100.0, avg_gain, avg_loss
+    rs = avg_gain / avg_loss
+    return 100.0 - 100.0 / (1.0 + rs), avg_gain, avg_loss
@@ -2,12 +2,75 @@
 SSI Trading Bot (Inherits from BaseBot)
 """
 import json
+import queue
+import sys
 import time
 import threading
-from base_bot import BaseTradingBot
+from operator import itemgetter
+
+import numpy as np
+
+from base_bot import BaseTradingBot, Candle, RING_SIZE
 from ssi_fctrading import FCTradingClient, FCTradingStream
 from ssi_fc_data import FCDataClient, model, fc_md_stream
 
+try:
+    import orjson
+
+    class _OrjsonShim:
+        """stdlib-json-compatible facade over orjson for the SSI SDK"""
+        dumps = staticmethod(lambda obj, **kw: orjson.dumps(obj).decode())
+        loads = staticmethod(orjson.loads)
+
+    # The SDK serializes order payloads and parses responses with stdlib
+    # json; swapping its module-level reference gives it the C parser
+    # without touching SDK code. Only modules holding the real stdlib
+    # module are patched, so anything already customized is left alone.
+    for _name, _mod in list(sys.modules.items()):
+        if (_name.startswith(('ssi_fctrading', 'ssi_fc_data'))
+                and getattr(_mod, 'json', None) is json):
+            _mod.json = _OrjsonShim()
+
+    # Pre-bound C parser for our own stream callbacks (accepts str or bytes)
+    _loads = orjson.loads
+except ImportError:  # orjson optional — SDK and callbacks keep stdlib json
+    _loads = json.loads
+
+# One C-level call extracts all six kline fields instead of six subscripts
+_KLINE_FIELDS = itemgetter('t', 'o', 'h', 'l', 'c', 'v')
+
+# Side codes as a table lookup; also rejects unknown sides with a KeyError
+# instead of silently sending 'S'
+_SIDE_MAP = {'BUY': 'B', 'SELL': 'S'}
+
+try:
+    import msgspec
+
+    class _Kline(msgspec.Struct):
+        """Typed view of the kline fields we actually read"""
+        t: int
+        o: float
+        h: float
+        l: float
+        c: float
+        v: float
+        x: bool
+
+    class _KlineMsg(msgspec.Struct):
+        k: _Kline
+
+    class _Trade(msgspec.Struct):
+        """Typed view of a trade frame — only the price is read"""
+        p: float
+
+    # Decode straight into C structs with fixed field offsets — no dict
+    # hashing; strict=False coerces string-typed numerics to float in C
+    _KLINE_DECODER = msgspec.json.Decoder(_KlineMsg, strict=False)
+    _TRADE_DECODER = msgspec.json.Decoder(_Trade, strict=False)
+except ImportError:  # msgspec optional — fall back to the dict path
+    _KLINE_DECODER = None
+    _TRADE_DECODER = None
+
 
 class SSITradingBot(BaseTradingBot):
     def __init__(
@@ -24,10 +87,21 @@ class SSITradingBot(BaseTradingBot):
         self.url = config.get('url', 'https://fc-trade.ssi.com.vn/')
         self.trade_amount_qty = config.get('trade_amount_qty', 1)
         self.otp = otp
+        # Mode never changes after construction — branch on a bool, not a
+        # string compare
+        self._is_fut = self.mode == 'futures'
+        # Market-data channel is fixed per bot; assemble it once
+        self._md_channel = f"B:{self.symbol}"
         
         # Stream objects
         self.trading_stream = None
         self.md_stream = None
+
+        # Closed candles are handed off to one consumer thread so the
+        # signalr callback returns immediately and the socket stays drained
+        self._candle_q = queue.SimpleQueue()
+        self._candle_thread = threading.Thread(target=self._consume_candles, daemon=True)
+        self._candle_thread.start()
         
         # Initialize clients
         # CP1:
@@ -54,12 +128,22 @@ class SSITradingBot(BaseTradingBot):
 
     def get_symbol_info(self):
         """Get symbol specifics"""
-        if self.mode == 'futures':
+        if self._is_fut:
             self.tick_size = 0.1
             self.step_size = 1
         else:
             self.tick_size = 100
             self.step_size = 100
+        self._compute_round_scales()
+        # Everything but side and quantity is fixed for the bot's lifetime,
+        # so resolve the market/order-type branches once here
+        self._order_tmpl = {
+            "instrumentID": self.symbol,
+            "market": "VNFE" if self._is_fut else "VN",
+            "orderType": 'MTL' if self._is_fut else 'MP',  # Default Market
+            "price": 0,
+            "channelID": "TA"
+        }
         print(f"📊 Symbol Info: Tick {self.tick_size}, Step {self.step_size}")
 
     def calculate_quantity(self):
@@ -75,17 +159,10 @@ class SSITradingBot(BaseTradingBot):
         #   -> Khi hủy lệnh thì chỉ sử dụng orderID
         #   -> Khi đặt lệnh cần lưu lại requestID rồi dựa vào requestID đấy mapping với orderID ở kênh stream để cập nhật trạng thái lệnh
         # - Chưa hỗ trợ đặt và hủy lệnh theo batch
-        ssi_side = 'B' if side == 'BUY' else 'S'
-        order_type_api = 'MTL' if self.mode == 'futures' else 'MP' # Default Market
-        
         req = {
-            "instrumentID": self.symbol,
-            "market": "VNFE" if self.mode == 'futures' else "VN",
-            "buySell": ssi_side,
-            "quantity": quantity,
-            "orderType": order_type_api,
-            "price": 0,
-            "channelID": "TA"
+            **self._order_tmpl,
+            "buySell": _SIDE_MAP[side],
+            "quantity": quantity
         }
         
         # Real API call would go here:
@@ -101,26 +178,60 @@ class SSITradingBot(BaseTradingBot):
     def on_trade_message(self, ws, message):
         """Process trade data"""
         try:
-            data = json.loads(message)
-            self.current_price = float(data['p'])
-            self.check_position_management()
+            if _TRADE_DECODER is not None:
+                # Price arrives as a native float from the typed decoder
+                price = _TRADE_DECODER.decode(message).p
+            else:
+                price = float(_loads(message)['p'])
+            self.current_price = price
+            self._record_trade(price, time.time())
+            if self._in_position:
+                self.check_position_management()
         except Exception:
             pass
 
-    def on_trading_open(self):
+    def on_trading_open(self, ws=None):
         """Callback for Trading Stream Open"""
         print("✅ Trading Stream Connected")
 
+    def on_data_open(self, ws=None):
+        """Callback for Data Stream Open"""
+        print("✅ Data Stream Connected")
+
     def on_kline_message(self, ws, message):
         """Process kline data"""
-        try:
-            data = json.loads(message)
-            kline = data['k']
-            if kline['x']:
-                self.klines.append({
-                    'time': kline['t'], 'open': kline['o'], 'high': kline['h'], 
-                    'low': kline['l'], 'close': kline['c'], 'volume': kline['v']
-                })
+        # Parse errors are reported and the frame dropped; strategy/order
+        # errors are logged by the consumer thread, which keeps running
+        if _KLINE_DECODER is not None:
+            try:
+                k = _KLINE_DECODER.decode(message).k
+            except msgspec.DecodeError as e:
+                self._log(f"Kline Error: {e}")
+                return
+            if not k.x:
+                return
+            # Struct attributes go straight into the hand-off tuple — no
+            # dict staging, no float() coercion
+            self._candle_q.put((k.t, k.o, k.h, k.l, k.c, k.v))
+        else:
+            try:
+                kline = _loads(message)['k']
+                if not kline['x']:
+                    return
+                # Convert string fields exactly once at ingest
+                self._candle_q.put(tuple(map(float, _KLINE_FIELDS(kline))))
+            except (ValueError, KeyError, TypeError) as e:
+                self._log(f"Kline Error: {e}")
+
+    def _consume_candles(self):
+        """Daemon thread: apply queued closed candles and run the strategy"""
+        q_get = self._candle_q.get
+        while True:
+            candle = q_get()
+            # Log and keep consuming — an unhandled error here would kill
+            # the only thread that evaluates candles for the bot's lifetime
+            try:
+                self.append_candle(*candle)
                 signal = self.check_strategy()
                 if signal:
                     if (signal == 'BUY' and self.position != 'LONG') or \
@@ -128,29 +239,51 @@ class SSITradingBot(BaseTradingBot):
                         if self.position: self.close_position()
                         self.open_position(signal)
                 self.print_status()
-        except Exception as e:
-            print(f"Kline Error: {e}")
+            except Exception as e:
+                self._log(f"❌ Candle consumer error: {e}")
+
+    def print_status(self):
+        """Status plus candle-queue backlog when the consumer lags"""
+        before = self._last_status_t
+        super().print_status()
+        if self._last_status_t != before:
+            backlog = self._candle_q.qsize()
+            if backlog:
+                self._log(f"📦 Candle queue backlog: {backlog}")
 
     def on_data_error(self, error):
         """Callback for Data Stream Errors"""
-        print(f"❌ Data Stream Error: {error}")
+        self._log(f"❌ Data Stream Error: {error}")
+        if self.running:
+            self._resubscribe()
+
+    def _resubscribe(self):
+        """Re-attach the market-data subscription on the existing stream.
+
+        Reusing the constructed stream object keeps the TLS session warm —
+        only the subscription is redone, not the handshake.
+        """
+        try:
+            self.md_stream.start(
+                self.on_kline_message, self.on_data_error, self._md_channel
+            )
+        except Exception as e:
+            self._log(f"❌ Resubscribe failed: {e}")
 
     def _run_trading_stream(self):
         """Thread target for Trading Stream"""
         try:
             self.trading_stream.start()
-            while self.running:
-                time.sleep(1)
+            # Park until stop() — no per-second wakeups on this thread
+            self._stop_event.wait()
         except Exception as e:
             print(f"❌ Trading Stream Thread Error: {e}")
 
     def _run_data_stream(self):
         """Thread target for Data Stream"""
         try:
-            channel = f"B:{self.symbol}"
-            self.md_stream.start(self.on_kline_message, self.on_data_error, channel)
-            while self.running:
-                time.sleep(1)
+            self.md_stream.start(self.on_kline_message, self.on_data_error, self._md_channel)
+            self._stop_event.wait()
         except Exception as e:
             print(f"❌ Data Stream Thread Error: {e}")
 
@@ -163,26 +296,29 @@ class SSITradingBot(BaseTradingBot):
         # - Trading thì đang chia message lỗi cho 2 kênh tiếp cập -> callback 2 function 
         #   -> khi xử lý luồng bot cần để ý 2 callback này để tránh miss event
 
-        # 1. Setup Trading Stream
-        self.trading_stream = FCTradingStream(
-            self.trading_client, 
-            self.url, 
-            self.on_trade_message, 
-            self.on_trade_message, 
-            on_open=lambda ws: print("✅ Trade WS connected")
-        )
-        
+        # 1. Setup Trading Stream (constructed once — reconnect churn should
+        # not pay object construction + TLS setup again)
+        if self.trading_stream is None:
+            self.trading_stream = FCTradingStream(
+                self.trading_client,
+                self.url,
+                self.on_trade_message,
+                self.on_trade_message,
+                on_open=self.on_trading_open
+            )
+
         # 2. Setup Market Data Stream
-        class Config:
-            def __init__(self):
-                self.stream_url = "wss://fc-data.ssi.com.vn/"
-                self.auth_type = "Bearer"
-        
-        self.md_stream = fc_md_stream.MarketDataStream(
-            Config(), 
-            self.data_client, 
-            on_open=lambda ws: print("✅ Kline WS connected")
-        )
+        if self.md_stream is None:
+            class Config:
+                def __init__(self):
+                    self.stream_url = "wss://fc-data.ssi.com.vn/"
+                    self.auth_type = "Bearer"
+
+            self.md_stream = fc_md_stream.MarketDataStream(
+                Config(),
+                self.data_client,
+                on_open=self.on_data_open
+            )
         
         # 3. Start Threads
         # Using separate thread methods to keep Main Thread clean just like Binance's run_forever logic
@@ -212,11 +348,19 @@ class SSITradingBot(BaseTradingBot):
             pageIndex=1,
             pageSize=200
         )
-        for k in klines:
-            self.klines.append({
-                'time': k[0], 'open': k[1], 'high': k[2], 'low': k[3], 'close': k[4], 'volume': k[5]
-            })
-        print(f"Loaded {len(self.klines)} candles")
+        # One vectorized conversion instead of a Python loop per candle.
+        # Empty history (bad symbol, holiday range, API hiccup) comes back
+        # as a 1-D empty array — skip the load instead of indexing axis 1
+        arr = np.asarray(klines, dtype=np.float64)
+        if arr.ndim == 2 and len(arr):
+            rows = arr[-RING_SIZE:]
+            n = len(rows)
+            for i, f in enumerate('tohlcv'):
+                self._ring[f][:n] = rows[:, i]
+            self._head = n
+            self._seed_indicators()
+            self.klines.extend(Candle(*row) for row in rows.tolist())
+        print(f"Loaded {self._head} candles")
         
         self.running = True
         self.start_stream()